@@ -0,0 +1,54 @@
+"""
+In-process caches for read-heavy endpoints.
+"""
+
+from typing import Hashable, Optional
+from uuid import UUID
+
+from cachetools import TTLCache
+
+# Constants
+BOOK_CACHE_MAXSIZE = 10_000
+BOOK_CACHE_TTL = 60  # seconds
+
+
+class BookCache:
+    """Cache serialized JSON bodies for single books and book list pages.
+
+    The cache is per process, so writes made by other workers only become
+    visible once the TTL expires.
+
+    Every invalidation bumps a generation counter. Readers take the
+    generation before querying and pass it back when storing, so a result
+    read before a local write can never be cached after it.
+    """
+
+    def __init__(self, maxsize: int = BOOK_CACHE_MAXSIZE, ttl: int = BOOK_CACHE_TTL):
+        self._books = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._pages = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.generation = 0
+
+    def get_book(self, book_id: UUID) -> Optional[bytes]:
+        return self._books.get(book_id)
+
+    def set_book(self, book_id: UUID, body: bytes, generation: int) -> None:
+        if generation == self.generation:
+            self._books[book_id] = body
+
+    def get_page(self, key: Hashable) -> Optional[bytes]:
+        return self._pages.get(key)
+
+    def set_page(self, key: Hashable, body: bytes, generation: int) -> None:
+        if generation == self.generation:
+            self._pages[key] = body
+
+    def invalidate(self, book_id: Optional[UUID] = None) -> None:
+        """Drop a changed book and every list page, which may include it"""
+        self.generation += 1
+        if book_id is not None:
+            self._books.pop(book_id, None)
+        self._pages.clear()
+
+
+# Create global book cache instance
+book_cache = BookCache()
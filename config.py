@@ -4,6 +4,9 @@ Configuration module for environment variables and application settings.
 """
 
 import os
+import re
+from types import MappingProxyType
+from urllib.parse import parse_qsl, urlsplit
 
 from dotenv import load_dotenv
 
@@ -11,6 +14,7 @@ from dotenv import load_dotenv
 DEFAULT_ENVIRONMENT = "production"
 DEFAULT_LOG_LEVEL = "INFO"
 DEFAULT_AWS_REGION = "us-east-1"
+DEFAULT_POOL_SIZE = 10
 MAX_FILE_SIZE_MB = 100
 MAX_FILE_SIZE = MAX_FILE_SIZE_MB * 1024 * 1024 
 
@@ -21,13 +25,26 @@ load_dotenv()
 DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise ValueError("DATABASE_URL environment variable is required")
-# Convert postgresql:// to postgres:// for asyncpg compatibility
-DATABASE_URL = DATABASE_URL.replace("postgresql://", "postgres://")
+# Convert postgresql:// to postgres:// for asyncpg compatibility (scheme only, so
+# credentials that happen to contain the same text are left untouched)
+DATABASE_URL = re.sub(r"^postgresql://", "postgres://", DATABASE_URL, count=1)
+_database_url_parts = urlsplit(DATABASE_URL)
+DATABASE_HOST = _database_url_parts.hostname
+# Percent-decoded query parameters, e.g. {"sslmode": "require"}
+DATABASE_QUERY_PARAMS = dict(parse_qsl(_database_url_parts.query, keep_blank_values=True))
+# Set by the Lambda runtime; used to decide whether the Mangum adapter is needed
+IS_LAMBDA = bool(os.getenv("AWS_LAMBDA_FUNCTION_NAME"))
+# Connections per worker process; the pool is opened at this size and never shrinks.
+# A Lambda instance serves one request at a time, so one connection is enough there.
+POOL_SIZE = int(os.getenv("POOL_SIZE", "1" if IS_LAMBDA else str(DEFAULT_POOL_SIZE)))
 
 # Application settings
 ENVIRONMENT = os.getenv("ENVIRONMENT", DEFAULT_ENVIRONMENT)
 DEBUG = ENVIRONMENT == "development"
 LOG_LEVEL = os.getenv("LOG_LEVEL", DEFAULT_LOG_LEVEL)
+# Schema DDL runs at startup (serialized across workers by an advisory lock).
+# Set RUN_MIGRATIONS=0 to skip it once the schema is known to be current.
+RUN_MIGRATIONS = os.getenv("RUN_MIGRATIONS", "1") == "1"
 
 # AWS S3 Configuration
 AWS_ACCESS_KEY_ID = os.getenv("AWS_ACCESS_KEY_ID")
@@ -36,9 +53,11 @@ AWS_REGION = os.getenv("AWS_REGION", DEFAULT_AWS_REGION)
 S3_BUCKET_NAME = os.getenv("S3_BUCKET_NAME")
 
 # File upload settings
-ALLOWED_EXTENSIONS = {
-    "image": ["jpg", "jpeg", "png", "gif", "webp"],
-    "document": ["pdf", "doc", "docx", "txt", "csv", "xlsx"],
-    "video": ["mp4", "mov", "avi", "mkv"],
-    "audio": ["mp3", "wav", "ogg"],
-}
+ALLOWED_EXTENSIONS = MappingProxyType({
+    "image": ("jpg", "jpeg", "png", "gif", "webp"),
+    "document": ("pdf", "doc", "docx", "txt", "csv", "xlsx"),
+    "video": ("mp4", "mov", "avi", "mkv"),
+    "audio": ("mp3", "wav", "ogg"),
+})
+# Flat lookup built once so checking an upload's extension is a single set probe
+ALLOWED_EXT_SET = frozenset(ext for exts in ALLOWED_EXTENSIONS.values() for ext in exts)
@@ -4,30 +4,54 @@ import time
 import weakref
 from contextlib import asynccontextmanager
 from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
 
 import asyncpg
 from fastapi import HTTPException, status
 
-from config import DATABASE_URL
+from config import (DATABASE_HOST, DATABASE_QUERY_PARAMS, DATABASE_URL,
+                    POOL_SIZE, RUN_MIGRATIONS)
 
 logger = logging.getLogger(__name__)
 
 # Global connection pool
 db_pool: Optional[asyncpg.Pool] = None
 _pool_lock = asyncio.Lock()
+
+# Monotonic time of this process's last books_stats_mv refresh
+_stats_refreshed_at: Optional[int] = None
+_stats_refresh_lock = asyncio.Lock()
+# Write counter for books as of that refresh, see BOOKS_WRITE_COUNT_SQL
+_stats_write_count: Optional[int] = None
 _initialization_in_progress = False
 
 class DatabaseConfig:
     """Database configuration constants"""
-    MIN_SIZE = 2
-    MAX_SIZE = 20
+    # Pre-warm every connection so no request pays Neon's TLS handshake
+    MIN_SIZE = POOL_SIZE
+    MAX_SIZE = POOL_SIZE
     MAX_QUERIES = 50000
-    MAX_INACTIVE_CONNECTION_LIFETIME = 300
+    # With a fixed-size pool, closing idle connections would only push the handshake
+    # onto the next request, so keep them open. The cost: open connections keep a
+    # Neon compute from scaling to zero while the app is up.
+    MAX_INACTIVE_CONNECTION_LIFETIME = 0 if MIN_SIZE == MAX_SIZE else 300
     CONNECTION_TIMEOUT = 30
     COMMAND_TIMEOUT = 60
     HEALTH_CHECK_INTERVAL = 30
+    STATS_REFRESH_INTERVAL = 10
+    # Readers refresh books_stats_mv themselves past this age, e.g. on Lambda
+    # where lifespan is off and the background refresh loop never starts
+    STATS_MAX_AGE = 2 * STATS_REFRESH_INTERVAL
+    # An explicit sslmode in DATABASE_URL wins; otherwise only local servers skip TLS
+    SSL_MODE = DATABASE_QUERY_PARAMS.get("sslmode") or (
+        "prefer" if DATABASE_HOST in ("localhost", "127.0.0.1") else "require"
+    )
     MAX_RETRIES = 3
     RETRY_DELAY_BASE = 0.5
+    # The app issues a small, fixed set of statements; keep all of them prepared
+    STATEMENT_CACHE_SIZE = 1024
+    MAX_CACHEABLE_STATEMENT_SIZE = 16 * 1024
+    MAX_CACHED_STATEMENT_LIFETIME = 0  # never expire cached statements
     
     @classmethod
     def get_pool_settings(cls) -> Dict[str, Any]:
@@ -39,27 +63,45 @@ class DatabaseConfig:
             "max_inactive_connection_lifetime": cls.MAX_INACTIVE_CONNECTION_LIFETIME,
             "timeout": cls.CONNECTION_TIMEOUT,
             "command_timeout": cls.COMMAND_TIMEOUT,
+            "statement_cache_size": cls.STATEMENT_CACHE_SIZE,
+            "max_cacheable_statement_size": cls.MAX_CACHEABLE_STATEMENT_SIZE,
+            "max_cached_statement_lifetime": cls.MAX_CACHED_STATEMENT_LIFETIME,
             "server_settings": {
                 "application_name": "fastapi_file_service",
                 "jit": "off",
-                "timezone": "UTC"
+                "timezone": "UTC",
+                "idle_in_transaction_session_timeout": "0"
             }
         }
 
+async def init_connection(conn: asyncpg.Connection) -> None:
+    """Per-connection setup run by the pool for every new connection"""
+    # Decode NUMERIC straight to float instead of building Decimal objects per row
+    await conn.set_type_codec(
+        "numeric",
+        encoder=str,
+        decoder=float,
+        schema="pg_catalog",
+        format="text",
+    )
+
 class DatabaseHealthChecker:
     """Monitor database connection health"""
     
+    # Monotonic nanoseconds, so wall-clock jumps can't stall or force checks
+    CHECK_INTERVAL_NS = DatabaseConfig.HEALTH_CHECK_INTERVAL * 1_000_000_000
+    
     def __init__(self):
-        self.last_check = 0
+        self.last_check: Optional[int] = None
         self.is_healthy = True
         self.consecutive_failures = 0
         
     async def check_health(self, pool: asyncpg.Pool) -> bool:
         """Check if database connection is healthy"""
-        now = time.time()
+        now = time.monotonic_ns()
         
         # Skip frequent checks
-        if now - self.last_check < DatabaseConfig.HEALTH_CHECK_INTERVAL:
+        if self.last_check is not None and now - self.last_check < self.CHECK_INTERVAL_NS:
             return self.is_healthy
             
         try:
@@ -74,46 +116,90 @@ class DatabaseHealthChecker:
         except Exception as e:
             self.consecutive_failures += 1
             self.is_healthy = False
-            logger.warning(f"Database health check failed (attempt {self.consecutive_failures}): {e}")
+            logger.warning("Database health check failed (attempt %s): %s", self.consecutive_failures, e)
             
             if self.consecutive_failures >= 3:
                 logger.error("Database connection appears to be down after multiple health check failures")
                 
             return False
 
+    def last_check_timestamp(self) -> Optional[float]:
+        """Wall-clock time of the last successful check, for reporting"""
+        if self.last_check is None:
+            return None
+        return time.time() - (time.monotonic_ns() - self.last_check) / 1_000_000_000
+
 # Global health checker instance
 health_checker = DatabaseHealthChecker()
 
 async def get_database_url_info() -> str:
     """Get safe database URL info for logging (without credentials)"""
-    try:
-        if '@' in DATABASE_URL and '/' in DATABASE_URL:
-            # Extract host info safely
-            parts = DATABASE_URL.split('@')
-            if len(parts) > 1:
-                host_part = parts[1].split('/')[0]
-                return host_part
-        return "Unknown host"
-    except Exception:
+    if not DATABASE_HOST:
         return "Unknown host"
+    try:
+        port = urlsplit(DATABASE_URL).port
+    except ValueError:
+        # Multi-host DSNs ("h1:5432,h2:5432") are valid for asyncpg but have no single port
+        port = None
+    return f"{DATABASE_HOST}:{port}" if port else DATABASE_HOST
 
 async def create_database_tables(conn: asyncpg.Connection) -> None:
     """Create all required database tables and indexes"""
     try:
         logger.info("Creating database tables and indexes...")
         
+        # Row sampling for /books/random-book; optional, the endpoint has a fallback
+        try:
+            await conn.execute("CREATE EXTENSION IF NOT EXISTS tsm_system_rows;")
+        except asyncpg.PostgresError as e:
+            logger.warning("tsm_system_rows extension unavailable: %s", e)
+
         # Create books table
         await conn.execute("""
             CREATE TABLE IF NOT EXISTS books (
-                book_id VARCHAR(32) PRIMARY KEY,
+                book_id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
                 name VARCHAR(255) NOT NULL,
                 genre VARCHAR(20) NOT NULL CHECK (genre IN ('fiction', 'non-fiction')),
                 price DECIMAL(10, 2) NOT NULL CHECK (price > 0),
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                created_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
             );
         """)
 
+        # Migrate book IDs created before the native UUID column (32-char hex strings)
+        await conn.execute("""
+            DO $$
+            BEGIN
+                IF EXISTS (
+                    SELECT 1 FROM information_schema.columns
+                    WHERE table_name = 'books'
+                      AND column_name = 'book_id'
+                      AND data_type = 'character varying'
+                ) THEN
+                    ALTER TABLE books
+                        ALTER COLUMN book_id TYPE UUID USING book_id::uuid,
+                        ALTER COLUMN book_id SET DEFAULT gen_random_uuid();
+                END IF;
+            END $$;
+        """)
+
+        # Migrate books timestamps created before TIMESTAMPTZ was used (stored as UTC)
+        await conn.execute("""
+            DO $$
+            BEGIN
+                IF EXISTS (
+                    SELECT 1 FROM information_schema.columns
+                    WHERE table_name = 'books'
+                      AND column_name = 'created_at'
+                      AND data_type = 'timestamp without time zone'
+                ) THEN
+                    ALTER TABLE books
+                        ALTER COLUMN created_at TYPE TIMESTAMPTZ USING created_at AT TIME ZONE 'UTC',
+                        ALTER COLUMN updated_at TYPE TIMESTAMPTZ USING updated_at AT TIME ZONE 'UTC';
+                END IF;
+            END $$;
+        """)
+
         # Create books indexes
         await conn.execute("""
             CREATE INDEX IF NOT EXISTS idx_books_genre ON books(genre);
@@ -141,10 +227,26 @@ async def create_database_tables(conn: asyncpg.Connection) -> None:
                 EXECUTE FUNCTION update_updated_at_column();
         """)
         
+        # Create a materialized view for book statistics, refreshed in the background.
+        # The constant id column gives it the unique index REFRESH ... CONCURRENTLY needs.
+        await conn.execute("""
+            CREATE MATERIALIZED VIEW IF NOT EXISTS books_stats_mv AS
+            SELECT
+                1 AS id,
+                COUNT(*) AS total_books,
+                COUNT(*) FILTER (WHERE genre = 'fiction') AS fiction_count,
+                COUNT(*) FILTER (WHERE genre = 'non-fiction') AS non_fiction_count,
+                AVG(price) AS average_price,
+                MIN(price) AS min_price,
+                MAX(price) AS max_price
+            FROM books;
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_books_stats_mv_id ON books_stats_mv(id);
+        """)
+
         # Create file_uploads table with improved constraints
         await conn.execute("""
             CREATE TABLE IF NOT EXISTS file_uploads (
-                id SERIAL PRIMARY KEY,
+                id BIGSERIAL PRIMARY KEY,
                 original_filename VARCHAR(255) NOT NULL,
                 s3_key VARCHAR(500) NOT NULL UNIQUE,
                 s3_url VARCHAR(1000) NOT NULL,
@@ -162,12 +264,28 @@ async def create_database_tables(conn: asyncpg.Connection) -> None:
                 updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 
                 -- Add constraint to prevent null bytes and control characters
-                CONSTRAINT check_filename_clean CHECK (original_filename !~ '[\x00-\x08\x0B\x0C\x0E-\x1F\x7F-\x9F]'),
+                CONSTRAINT check_filename_clean CHECK (original_filename !~ '[\\x00-\\x08\\x0B\\x0C\\x0E-\\x1F\\x7F-\\x9F]'),
                 CONSTRAINT check_no_empty_filename CHECK (LENGTH(TRIM(original_filename)) > 0),
                 CONSTRAINT check_s3_key_format CHECK (s3_key ~ '^[a-zA-Z0-9._/-]+$')
             );
         """)
         
+        # Widen file_uploads IDs created before BIGSERIAL was used (int4 caps at ~2.1B rows)
+        await conn.execute("""
+            DO $$
+            BEGIN
+                IF EXISTS (
+                    SELECT 1 FROM information_schema.columns
+                    WHERE table_name = 'file_uploads'
+                      AND column_name = 'id'
+                      AND data_type = 'integer'
+                ) THEN
+                    ALTER TABLE file_uploads ALTER COLUMN id TYPE BIGINT;
+                    ALTER SEQUENCE IF EXISTS file_uploads_id_seq AS BIGINT;
+                END IF;
+            END $$;
+        """)
+
         # Create indexes for file_uploads table
         await conn.execute("""
             CREATE INDEX IF NOT EXISTS idx_file_uploads_s3_key ON file_uploads(s3_key);
@@ -207,9 +325,17 @@ async def create_database_tables(conn: asyncpg.Connection) -> None:
         logger.info("Database tables and indexes created successfully")
         
     except Exception as e:
-        logger.error(f"Failed to create database tables: {e}")
+        logger.error("Failed to create database tables: %s", e)
         raise
 
+async def run_schema_migrations(conn: asyncpg.Connection) -> None:
+    """Apply schema DDL while holding an advisory lock so concurrent cold starts don't race"""
+    await conn.execute("SELECT pg_advisory_lock(hashtext('bookstore_migrations'))")
+    try:
+        await create_database_tables(conn)
+    finally:
+        await conn.execute("SELECT pg_advisory_unlock(hashtext('bookstore_migrations'))")
+
 async def init_db(force_recreate: bool = False) -> asyncpg.Pool:
     """Initialize DB connection pool and create tables"""
     global db_pool, _initialization_in_progress
@@ -233,27 +359,30 @@ async def init_db(force_recreate: bool = False) -> asyncpg.Pool:
         
         try:
             db_info = await get_database_url_info()
-            logger.info(f"Initializing DB connection pool to: {db_info}")
-            
-            # Determine SSL requirements
-            ssl_mode = "require"
-            if "localhost" in DATABASE_URL or "127.0.0.1" in DATABASE_URL:
-                ssl_mode = "prefer"
+            logger.info("Initializing DB connection pool to: %s", db_info)
             
             pool_config = DatabaseConfig.get_pool_settings()
-            pool_config["ssl"] = ssl_mode
+            pool_config["ssl"] = DatabaseConfig.SSL_MODE
+            pool_config["init"] = init_connection
             
-            db_pool = await asyncpg.create_pool(DATABASE_URL, **pool_config)
+            pool = await asyncpg.create_pool(DATABASE_URL, **pool_config)
             
-            # Test the connection and create tables
-            async with db_pool.acquire(timeout=10) as conn:
-                await conn.fetchval("SELECT version()")
-                await create_database_tables(conn)
+            # Test the connection and, when enabled, create tables. The pool is only
+            # published once this succeeds, so a failed attempt is retried from scratch.
+            try:
+                async with pool.acquire(timeout=10) as conn:
+                    await conn.fetchval("SELECT 1")
+                    if RUN_MIGRATIONS:
+                        await run_schema_migrations(conn)
+            except BaseException:
+                await pool.close()
+                raise
+            db_pool = pool
             
             # Initial health check
             await health_checker.check_health(db_pool)
             
-            logger.info(f"Database pool initialized successfully with {DatabaseConfig.MIN_SIZE}-{DatabaseConfig.MAX_SIZE} connections")
+            logger.info("Database pool initialized successfully with %s-%s connections", DatabaseConfig.MIN_SIZE, DatabaseConfig.MAX_SIZE)
             return db_pool
             
         except asyncpg.InvalidAuthorizationSpecificationError:
@@ -263,19 +392,19 @@ async def init_db(force_recreate: bool = False) -> asyncpg.Pool:
                 detail="Database authentication failed"
             )
         except asyncpg.InvalidCatalogNameError as e:
-            logger.error(f"Database does not exist: {e}")
+            logger.error("Database does not exist: %s", e)
             raise HTTPException(
                 status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
                 detail="Database not found"
             )
         except asyncpg.ConnectionDoesNotExistError as e:
-            logger.error(f"Cannot connect to database server: {e}")
+            logger.error("Cannot connect to database server: %s", e)
             raise HTTPException(
                 status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
                 detail="Database server unavailable"
             )
         except Exception as e:
-            logger.error(f"Failed to initialize database pool: {e}")
+            logger.error("Failed to initialize database pool: %s", e)
             raise HTTPException(
                 status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
                 detail=f"Database initialization failed: {str(e)}"
@@ -293,7 +422,7 @@ async def close_db() -> None:
                 await db_pool.close()
                 logger.info("Database connection pool closed successfully")
             except Exception as e:
-                logger.error(f"Error closing database pool: {e}")
+                logger.error("Error closing database pool: %s", e)
             finally:
                 db_pool = None
 
@@ -306,28 +435,29 @@ async def get_db_connection(timeout: float = 10.0):
     if not db_pool:
         await ensure_db_initialized()
     
-    connection = None
     try:
         connection = await db_pool.acquire(timeout=timeout)
-        yield connection
     except asyncio.TimeoutError:
         logger.error("Database connection timeout")
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="Database connection timeout"
+            detail="Database connection timeout",
         )
     except Exception as e:
-        logger.error(f"Database connection error: {e}")
+        logger.error("Database connection error: %s", e)
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="Database connection failed"
+            detail="Database connection failed",
         )
+
+    # Errors raised by the caller's block propagate unchanged
+    try:
+        yield connection
     finally:
-        if connection:
-            try:
-                await db_pool.release(connection)
-            except Exception as e:
-                logger.error(f"Error releasing database connection: {e}")
+        try:
+            await db_pool.release(connection)
+        except Exception as e:
+            logger.error("Error releasing database connection: %s", e)
 
 async def get_db():
     """FastAPI dependency to get DB connection with robust error handling"""
@@ -335,33 +465,42 @@ async def get_db():
         try:
             await init_db()
         except Exception as e:
-            logger.error(f"Database pool initialization failed: {e}")
+            logger.error("Database pool initialization failed: %s", e)
             raise HTTPException(
                 status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
                 detail="Database service unavailable",
             )
 
-    for attempt in range(DatabaseConfig.MAX_RETRIES):
-        try:
-            async with db_pool.acquire(timeout=DatabaseConfig.CONNECTION_TIMEOUT) as conn:
-                # Quick health check
-                await conn.fetchval("SELECT 1", timeout=5)
-                yield conn
-                return
-        except asyncio.TimeoutError:
-            logger.warning(f"Database connection timeout (attempt {attempt + 1})")
-        except Exception as e:
-            logger.warning(f"Database connection failed (attempt {attempt + 1}): {e}")
-            
-        if attempt < DatabaseConfig.MAX_RETRIES - 1:
-            wait_time = DatabaseConfig.RETRY_DELAY_BASE * (2 ** attempt)
-            await asyncio.sleep(wait_time)
-    
-    logger.error(f"Database connection failed after {DatabaseConfig.MAX_RETRIES} attempts")
-    raise HTTPException(
-        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-        detail="Database connection unavailable",
-    )
+    # The pool replaces connections that break (and the health checker pings it), so
+    # no per-request SELECT 1 probe is issued here. acquire()
+    # already waits up to CONNECTION_TIMEOUT for a free connection, so it is not retried.
+    # Keep a local reference so the connection goes back to the pool it came from even
+    # if the global is swapped (e.g. by close_db) while the request runs.
+    pool = db_pool
+    try:
+        conn = await pool.acquire(timeout=DatabaseConfig.CONNECTION_TIMEOUT)
+    except asyncio.TimeoutError:
+        logger.error("Database connection timeout")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Database connection unavailable",
+        )
+    except (
+        asyncpg.ConnectionDoesNotExistError,
+        asyncpg.InterfaceError,
+        asyncpg.PostgresError,
+        OSError,
+    ) as e:
+        logger.error("Database connection failed: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Database connection unavailable",
+        )
+
+    try:
+        yield conn
+    finally:
+        await pool.release(conn)
 
 async def ensure_db_initialized() -> asyncpg.Pool:
     """Ensure database is initialized before operations"""
@@ -393,7 +532,7 @@ async def execute_with_retry(query: str, *args, max_retries: int = 3) -> Any:
         except (asyncpg.ConnectionDoesNotExistError, asyncpg.InterfaceError) as e:
             if attempt == max_retries - 1:
                 raise
-            logger.warning(f"Database query failed (attempt {attempt + 1}): {e}")
+            logger.warning("Database query failed (attempt %s): %s", attempt + 1, e)
             await asyncio.sleep(DatabaseConfig.RETRY_DELAY_BASE * (attempt + 1))
     
 async def get_database_stats() -> Dict[str, Any]:
@@ -409,10 +548,10 @@ async def get_database_stats() -> Dict[str, Any]:
             "max_size": db_pool.get_max_size(),
             "idle_size": db_pool.get_idle_size(),
             "consecutive_failures": health_checker.consecutive_failures,
-            "last_health_check": health_checker.last_check
+            "last_health_check": health_checker.last_check_timestamp()
         }
     except Exception as e:
-        logger.error(f"Failed to get database stats: {e}")
+        logger.error("Failed to get database stats: %s", e)
         return {"status": "error", "error": str(e)}
 
 async def run_database_migration(migration_sql: str, description: str = "Migration") -> bool:
@@ -425,20 +564,83 @@ async def run_database_migration(migration_sql: str, description: str = "Migrati
             async with conn.transaction():
                 await conn.execute(migration_sql)
         
-        logger.info(f"Database migration completed successfully: {description}")
+        logger.info("Database migration completed successfully: %s", description)
         return True
         
     except Exception as e:
-        logger.error(f"Database migration failed: {description} - {e}")
+        logger.error("Database migration failed: %s - %s", description, e)
         return False
 
+# Cumulative row writes to books. The statistics collector lags real writes by up
+# to ~10s (backends flush counters in batches), which the refresh loop tolerates.
+# TRUNCATE isn't counted, but the app never truncates books.
+BOOKS_WRITE_COUNT_SQL = """
+    SELECT n_tup_ins + n_tup_upd + n_tup_del
+    FROM pg_stat_user_tables
+    WHERE relid = 'books'::regclass
+"""
+
+async def refresh_books_stats(conn: asyncpg.Connection) -> None:
+    """Recompute books_stats_mv without blocking readers of the old contents"""
+    global _stats_refreshed_at
+
+    await conn.execute("REFRESH MATERIALIZED VIEW CONCURRENTLY books_stats_mv")
+    _stats_refreshed_at = time.monotonic_ns()
+
+async def ensure_books_stats_fresh(
+    conn: asyncpg.Connection,
+    max_age: float = DatabaseConfig.STATS_MAX_AGE,
+) -> None:
+    """Refresh books_stats_mv if this process hasn't done so within max_age seconds"""
+    max_age_ns = max_age * 1_000_000_000
+
+    def is_fresh() -> bool:
+        return (
+            _stats_refreshed_at is not None
+            and time.monotonic_ns() - _stats_refreshed_at < max_age_ns
+        )
+
+    if is_fresh():
+        return
+    async with _stats_refresh_lock:
+        # Another request may have refreshed while this one waited
+        if is_fresh():
+            return
+        try:
+            await refresh_books_stats(conn)
+        except asyncpg.PostgresError as e:
+            # Serving the previous contents beats failing the request
+            logger.warning("Failed to refresh books statistics: %s", e)
+
+async def refresh_books_stats_loop(
+    interval: float = DatabaseConfig.STATS_REFRESH_INTERVAL,
+) -> None:
+    """Keep books_stats_mv fresh; run as a background task for the app's lifetime"""
+    global _stats_refreshed_at, _stats_write_count
+
+    while True:
+        await asyncio.sleep(interval)
+        if not db_pool:
+            continue
+        try:
+            async with db_pool.acquire() as conn:
+                write_count = await conn.fetchval(BOOKS_WRITE_COUNT_SQL)
+                if write_count is not None and write_count == _stats_write_count:
+                    # Nothing written since the last refresh, so the view is current
+                    _stats_refreshed_at = time.monotonic_ns()
+                    continue
+                await refresh_books_stats(conn)
+                _stats_write_count = write_count
+        except Exception as e:
+            logger.warning("Failed to refresh books statistics: %s", e)
+
 # Cleanup function for graceful shutdown
 async def cleanup_database():
     """Cleanup database connections on application shutdown"""
     try:
         await close_db()
     except Exception as e:
-        logger.error(f"Error during database cleanup: {e}")
+        logger.error("Error during database cleanup: %s", e)
 
 # Weak reference cleanup for connection tracking
 _active_connections = weakref.WeakSet()
\ No newline at end of file
@@ -1,18 +1,29 @@
 
 import logging
 
-from fastapi import HTTPException, Request
+import orjson
+from fastapi import HTTPException, Request, Response
 from fastapi.encoders import jsonable_encoder
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 
+from config import DEBUG
 from schemas import ErrorResponse
 
 logger = logging.getLogger(__name__)
 
+# Outside DEBUG the 500 body never varies, so encode it once
+_INTERNAL_ERROR_BODY = orjson.dumps(
+    ErrorResponse(
+        error="Internal Server Error",
+        detail="An unexpected error occurred",
+        status_code=500,
+    ).model_dump()
+)
+
 async def validation_exception_handler(
     request: Request, exc: RequestValidationError
-) -> JSONResponse:
+) -> ORJSONResponse:
     """Handle FastAPI validation errors."""
     logger.warning("Validation error: %s", exc.errors())
     error_response = ErrorResponse(
@@ -20,14 +31,14 @@ async def validation_exception_handler(
         detail=exc.errors(),
         status_code=422,
     )
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=422,
         content=jsonable_encoder(error_response),
     )
 
 async def http_exception_handler(
     request: Request, exc: HTTPException
-) -> JSONResponse:
+) -> ORJSONResponse:
     """Handle FastAPI HTTP exceptions."""
     logger.warning("HTTP error %d: %s", exc.status_code, exc.detail)
     error_response = ErrorResponse(
@@ -35,22 +46,28 @@ async def http_exception_handler(
         detail=None,
         status_code=exc.status_code,
     )
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=exc.status_code,
-        content=jsonable_encoder(error_response),
+        content=error_response.model_dump(),
     )
 
 async def generic_exception_handler(
     request: Request, exc: Exception
-) -> JSONResponse:
+) -> Response:
     """Handle uncaught exceptions."""
     logger.error("Unhandled exception: %s", exc, exc_info=True)
+    if not DEBUG:
+        return Response(
+            content=_INTERNAL_ERROR_BODY,
+            status_code=500,
+            media_type="application/json",
+        )
     error_response = ErrorResponse(
         error="Internal Server Error",
         detail=str(exc),
         status_code=500,
     )
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
-        content=jsonable_encoder(error_response),
+        content=error_response.model_dump(),
     )
@@ -1,48 +1,69 @@
+import asyncio
+import atexit
 import logging
+import queue
 import sys
 from contextlib import asynccontextmanager
+from logging.handlers import QueueHandler, QueueListener
 from typing import Optional
 
 from fastapi import FastAPI, Request
 from fastapi.exceptions import HTTPException, RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from mangum import Mangum
+from fastapi.responses import ORJSONResponse
 
-from config import DEBUG, ENVIRONMENT
-from database import close_db, init_db
+from config import DEBUG, ENVIRONMENT, IS_LAMBDA
+from database import close_db, init_db, refresh_books_stats_loop
 from exceptions import (generic_exception_handler, http_exception_handler,
                         validation_exception_handler)
 from middleware import add_process_time_header
 from routes.books import router as books_router
 from routes.files import router as files_router
-from routes.health import router as health_router
 from routes.root import router as root_router
 
 
 # --- Logging Configuration ---
 def setup_logging():
-    """Configure logging with proper formatting and handlers."""
+    """Configure logging with proper formatting and handlers.
+
+    Records are handed to a QueueHandler and written by a QueueListener thread,
+    so stream and file I/O never blocks the event loop.
+    """
     log_format = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    formatter = logging.Formatter(log_format)
     
-    handlers = [logging.StreamHandler(sys.stdout)]
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(formatter)
+    handlers = [stream_handler]
     
     if ENVIRONMENT == "production":
         # Add file handler for production
         file_handler = logging.FileHandler("app.log", encoding="utf-8")
-        file_handler.setFormatter(logging.Formatter(log_format))
+        file_handler.setFormatter(formatter)
         handlers.append(file_handler)
     
+    log_queue = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    # The listener's handlers apply the real format; only merge args here
+    queue_handler.setFormatter(logging.Formatter("%(message)s"))
+    
     logging.basicConfig(
         level=logging.INFO if ENVIRONMENT == "production" else logging.DEBUG,
-        format=log_format,
-        handlers=handlers,
+        handlers=[queue_handler],
         force=True  # Override any existing configuration
     )
     
-    # Set specific loggers
-    logging.getLogger("uvicorn").setLevel(logging.INFO)
-    logging.getLogger("uvicorn.access").setLevel(logging.INFO)
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    
+    # uvicorn's default log config gives these loggers their own stream handler and
+    # turns propagation off; clear that so their records go through the queue too
+    for name in ("uvicorn", "uvicorn.access"):
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers.clear()
+        uvicorn_logger.propagate = True
+        uvicorn_logger.setLevel(logging.INFO)
     
     return logging.getLogger(__name__)
 
@@ -71,12 +92,11 @@ db_state = DatabaseState()
 # --- Safe Database Initialization ---
 async def safe_init_db():
     """Safely initialize database with retry logic."""
-    import asyncio
     import re
     
     for attempt in range(db_state.max_retries):
         try:
-            logger.info(f"Database initialization attempt {attempt + 1}/{db_state.max_retries}")
+            logger.info("Database initialization attempt %s/%s", attempt + 1, db_state.max_retries)
             await init_db()
             db_state.is_connected = True
             db_state.initialization_error = None
@@ -97,7 +117,7 @@ async def safe_init_db():
                 except:
                     error_msg += " - (detail unavailable)"
             
-            logger.error(f"Attempt {attempt + 1} failed: {error_msg}")
+            logger.error("Attempt %s failed: %s", attempt + 1, error_msg)
             db_state.initialization_error = error_msg
             db_state.retry_count = attempt + 1
             
@@ -113,7 +133,7 @@ async def safe_init_db():
             except:
                 error_msg = "Database initialization error (details unavailable)"
             
-            logger.error(f"Attempt {attempt + 1} failed: {error_msg}")
+            logger.error("Attempt %s failed: %s", attempt + 1, error_msg)
             db_state.initialization_error = error_msg
             db_state.retry_count = attempt + 1
             
@@ -145,18 +165,21 @@ async def lifespan(app: FastAPI):
             # raise RuntimeError(f"Database initialization failed after {db_state.max_retries} attempts: {db_state.initialization_error}")
             logger.warning("Continuing startup without database connection")
     
+    stats_refresh_task = asyncio.create_task(refresh_books_stats_loop())
+
     logger.info("Application startup completed")
     
     try:
         yield
     finally:
         logger.info("Shutting down application...")
+        stats_refresh_task.cancel()
         try:
             if db_state.is_connected:
                 await close_db()
                 logger.info("Database connections closed successfully")
         except Exception as e:
-            logger.error(f"Error during database shutdown: {e}", exc_info=True)
+            logger.error("Error during database shutdown: %s", e, exc_info=True)
 
 # --- CORS Configuration ---
 def get_cors_origins():
@@ -187,15 +210,16 @@ app = FastAPI(
     redoc_url="/redoc" if ENVIRONMENT != "production" else None,
     openapi_url="/openapi.json" if ENVIRONMENT != "production" else None,
     debug=DEBUG,
+    default_response_class=ORJSONResponse,
 )
 
 # --- Custom Exception Handlers ---
 @app.exception_handler(DatabaseInitializationError)
 async def database_init_exception_handler(request: Request, exc: DatabaseInitializationError):
     """Handle database initialization errors with proper JSON response."""
-    logger.error(f"Database initialization error: {exc.message}")
+    logger.error("Database initialization error: %s", exc.message)
     
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=503,
         content={
             "error": "Service Unavailable",
@@ -267,7 +291,7 @@ async def database_health_check():
     if db_state.is_connected:
         return {"status": "connected", "message": "Database is available"}
     else:
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=503,
             content={
                 "status": "disconnected",
@@ -279,7 +303,6 @@ async def database_health_check():
 
 # --- Include Routers ---
 app.include_router(root_router)
-app.include_router(health_router)
 app.include_router(books_router, prefix="/api/v1", tags=["books"])
 app.include_router(files_router, prefix="/api/v1", tags=["files"])
 
@@ -287,9 +310,9 @@ app.include_router(files_router, prefix="/api/v1", tags=["files"])
 @app.on_event("startup")
 async def startup_event():
     """Log application startup information."""
-    logger.info(f"Starting Bookstore API in {ENVIRONMENT} environment")
-    logger.info(f"Debug mode: {DEBUG}")
-    logger.info(f"Documentation available: {ENVIRONMENT != 'production'}")
+    logger.info("Starting Bookstore API in %s environment", ENVIRONMENT)
+    logger.info("Debug mode: %s", DEBUG)
+    logger.info("Documentation available: %s", ENVIRONMENT != 'production')
 
 # --- Manual Database Retry Endpoint (for development/debugging) ---
 @app.post("/admin/retry-db", include_in_schema=False)
@@ -309,7 +332,11 @@ async def retry_database_connection():
     }
 
 # --- AWS Lambda Handler ---
-handler = Mangum(app, lifespan="off")  # Disable lifespan for Lambda
+if IS_LAMBDA:
+    # Only pay for the Mangum import and ASGI wrapper when running on Lambda
+    from mangum import Mangum
+
+    handler = Mangum(app, lifespan="off")  # Disable lifespan for Lambda
 
 # --- Local Development Entry Point ---
 if __name__ == "__main__":
@@ -341,6 +368,8 @@ if __name__ == "__main__":
         host="0.0.0.0",
         port=8000,
         reload=DEBUG,
+        loop="uvloop",
+        http="httptools",
         log_config=log_config if not DEBUG else None,
         access_log=True,
         reload_dirs=["./"] if DEBUG else None,
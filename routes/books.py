@@ -1,17 +1,106 @@
 import logging
-from typing import List, Literal, Optional
-from uuid import uuid4
+from typing import Dict, List, Literal, Optional
+from uuid import UUID
 
 import asyncpg
-from fastapi import APIRouter, Depends, HTTPException, status
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 
-from database import get_db
+from cache import book_cache
+from database import ensure_books_stats_fresh, get_db, get_db_connection
 from schemas import Book, BookResponse, BookUpdate, SuccessResponse
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["Books"], prefix="/books")
 
+MAX_BULK_BOOKS = 1000
+
+
+def _book_json(row) -> Dict:
+    """Map a books row to its JSON-ready dict.
+
+    Every books query selects (book_id, name, genre, price, created_at,
+    updated_at) in this order, so the Record is unpacked positionally rather
+    than looked up by key six times.
+    """
+    book_id, name, genre, price, created_at, updated_at = row
+    return {
+        "book_id": book_id,
+        "name": name,
+        "genre": genre,
+        "price": price,
+        "created_at": created_at,
+        "updated_at": updated_at,
+    }
+
+
+def _json_response(body: bytes) -> Response:
+    return Response(content=body, media_type="application/json")
+
+
+def _dumps(payload) -> bytes:
+    # OPT_UTC_Z matches Pydantic's rendering of UTC timestamps in BookResponse.
+    # asyncpg returns book_id as its own uuid.UUID subclass, which orjson only
+    # serializes through default.
+    return orjson.dumps(payload, default=str, option=orjson.OPT_UTC_Z)
+
+# Updatable columns in canonical SQL order, with their bit in the UPDATE_SQLS key
+_UPDATABLE_COLUMNS = (("name", 4), ("genre", 2), ("price", 1))
+
+
+def _build_update_sqls() -> Dict[int, str]:
+    """Build one UPDATE statement per non-empty subset of updatable columns.
+
+    Columns always appear in the same order, so asyncpg only ever sees these
+    7 statement texts and its prepared-statement cache stays warm.
+    """
+    sqls = {}
+    for mask in range(1, 1 << len(_UPDATABLE_COLUMNS)):
+        columns = [column for column, bit in _UPDATABLE_COLUMNS if mask & bit]
+        assignments = ", ".join(f"{column} = ${n}" for n, column in enumerate(columns, 1))
+        sqls[mask] = (
+            f"UPDATE books SET {assignments} WHERE book_id = ${len(columns) + 1} "
+            "RETURNING book_id, name, genre, price, created_at, updated_at"
+        )
+    return sqls
+
+
+UPDATE_SQLS = _build_update_sqls()
+
+# Pick one row from a small block sample instead of sorting the whole table
+# (needs tsm_system_rows). SYSTEM_ROWS reads whole pages from a random start
+# block, so a sample of 1 would only ever return the first row of a page;
+# shuffling a larger sample lets every row be chosen. Rows are still grouped
+# by page, so the choice is close to, not exactly, uniform.
+RANDOM_BOOK_SAMPLE_ROWS = 100
+RANDOM_BOOK_SQL = (
+    "SELECT book_id, name, genre, price, created_at, updated_at "
+    f"FROM books TABLESAMPLE SYSTEM_ROWS({RANDOM_BOOK_SAMPLE_ROWS}) "
+    "ORDER BY random() LIMIT 1"
+)
+# Without the extension, skip to a random offset within the planner's row
+# estimate instead of counting the table. A stale estimate can overshoot, so
+# the second branch (only run when the first is empty) returns the first row.
+RANDOM_BOOK_FALLBACK_SQL = (
+    "(SELECT book_id, name, genre, price, created_at, updated_at FROM books "
+    "OFFSET floor(random() * GREATEST("
+    "(SELECT reltuples FROM pg_class WHERE oid = 'books'::regclass), 0))::bigint "
+    "LIMIT 1) "
+    "UNION ALL "
+    "(SELECT book_id, name, genre, price, created_at, updated_at FROM books LIMIT 1) "
+    "LIMIT 1"
+)
+# Cleared on the first UndefinedObjectError so later requests go straight to the fallback
+_tablesample_available = True
+
+# price is sent as float8[] (NUMERIC's float codec in database.init_connection
+# is text-only) and cast to the column's NUMERIC type on insert
+BULK_INSERT_SQL = (
+    "INSERT INTO books (name, genre, price) "
+    "SELECT * FROM unnest($1::varchar[], $2::varchar[], $3::float8[])"
+)
+
 @router.post(
     "",
     response_model=BookResponse,
@@ -20,89 +109,159 @@ router = APIRouter(tags=["Books"], prefix="/books")
 )
 async def create_book(book: Book, conn: asyncpg.Connection = Depends(get_db)):
     """Create a new book in the database"""
-    book_id = uuid4().hex
-
     try:
-        await conn.execute(
-            "INSERT INTO books (book_id, name, genre, price) VALUES ($1, $2, $3, $4)",
-            book_id,
+        row = await conn.fetchrow(
+            "INSERT INTO books (name, genre, price) VALUES ($1, $2, $3) RETURNING book_id, name, genre, price, created_at, updated_at",
             book.name,
             book.genre,
             book.price,
         )
 
-        row = await conn.fetchrow(
-            "SELECT book_id, name, genre, price, created_at, updated_at FROM books WHERE book_id = $1",
-            book_id,
-        )
-
-        logger.info(f"Book created: {book_id} - {book.name}")
-        return BookResponse(
-            book_id=row["book_id"],
-            name=row["name"],
-            genre=row["genre"],
-            price=float(row["price"]),
-            created_at=row["created_at"].isoformat(),
-            updated_at=row["updated_at"].isoformat(),
-        )
+        book_cache.invalidate()
+        logger.info("Book created: %s - %s", row["book_id"], book.name)
+        return BookResponse.model_construct(**_book_json(row))
 
     except asyncpg.UniqueViolationError:
-        logger.warning(f"Book creation failed - duplicate ID: {book_id}")
+        logger.warning("Book creation failed - duplicate ID for: %s", book.name)
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail="Book with this ID already exists",
         )
-    except Exception as e:
-        logger.error(f"Book creation failed: {e}")
+    except (asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+        logger.error("Book creation failed: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to create book",
         )
 
+@router.post(
+    "/bulk",
+    response_model=SuccessResponse,
+    status_code=status.HTTP_201_CREATED,
+    summary="Create multiple books",
+)
+async def create_books_bulk(
+    books: List[Book], conn: asyncpg.Connection = Depends(get_db)
+):
+    """Create many books with a single INSERT"""
+    if not books:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No books provided",
+        )
+
+    if len(books) > MAX_BULK_BOOKS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many books. Maximum {MAX_BULK_BOOKS} books per request",
+        )
+
+    try:
+        # One array per column, unnested server-side: a single round trip and
+        # a single statement, so the insert is atomic without a transaction
+        await conn.execute(
+            BULK_INSERT_SQL,
+            [book.name for book in books],
+            [book.genre for book in books],
+            [book.price for book in books],
+        )
+
+        book_cache.invalidate()
+        logger.info("Bulk created %d books", len(books))
+        return SuccessResponse(
+            message=f"{len(books)} books created successfully",
+            status_code=201,
+            data={"created": len(books)},
+        )
+
+    except (asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+        logger.error("Bulk book creation failed: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to create books",
+        )
+
 @router.get(
     "",
-    response_model=List[BookResponse],
+    response_model=None,
+    responses={200: {"model": List[BookResponse]}},
     summary="Get all books",
 )
 async def list_books(
     genre: Optional[Literal["fiction", "non-fiction"]] = None,
-    limit: int = 100,
-    offset: int = 0,
-    conn: asyncpg.Connection = Depends(get_db),
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
 ):
     """Get all books with optional filtering and pagination"""
+    cache_key = (genre, limit, offset)
+    cached = book_cache.get_page(cache_key)
+    if cached is not None:
+        return _json_response(cached)
+
+    generation = book_cache.generation
     try:
-        if genre:
-            rows = await conn.fetch(
-                "SELECT book_id, name, genre, price, created_at, updated_at FROM books WHERE genre = $1 ORDER BY created_at DESC LIMIT $2 OFFSET $3",
-                genre,
-                limit,
-                offset,
-            )
-        else:
-            rows = await conn.fetch(
-                "SELECT book_id, name, genre, price, created_at, updated_at FROM books ORDER BY created_at DESC LIMIT $1 OFFSET $2",
-                limit,
-                offset,
-            )
+        async with get_db_connection() as conn:
+            if genre:
+                rows = await conn.fetch(
+                    "SELECT book_id, name, genre, price, created_at, updated_at FROM books WHERE genre = $1 ORDER BY created_at DESC LIMIT $2 OFFSET $3",
+                    genre,
+                    limit,
+                    offset,
+                )
+            else:
+                rows = await conn.fetch(
+                    "SELECT book_id, name, genre, price, created_at, updated_at FROM books ORDER BY created_at DESC LIMIT $1 OFFSET $2",
+                    limit,
+                    offset,
+                )
+
+        # Serialize straight from the rows with orjson; validating a BookResponse
+        # per row only to dump it again is the bulk of this endpoint's cost.
+        body = _dumps([_book_json(row) for row in rows])
+        book_cache.set_page(cache_key, body, generation)
+        return _json_response(body)
+
+    except (asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+        logger.error("Failed to fetch books: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to fetch books",
+        )
 
-        return [
-            BookResponse(
-                book_id=row["book_id"],
-                name=row["name"],
-                genre=row["genre"],
-                price=float(row["price"]),
-                created_at=row["created_at"].isoformat(),
-                updated_at=row["updated_at"].isoformat(),
+@router.get(
+    "/random-book",
+    response_model=BookResponse,
+    summary="Get a random book",
+)
+async def get_random_book(conn: asyncpg.Connection = Depends(get_db)):
+    """Get a random book from the database"""
+    global _tablesample_available
+
+    try:
+        row = None
+        if _tablesample_available:
+            try:
+                row = await conn.fetchrow(RANDOM_BOOK_SQL)
+            except asyncpg.UndefinedObjectError:
+                logger.warning("tsm_system_rows is not installed; using offset sampling")
+                _tablesample_available = False
+        if not _tablesample_available:
+            row = await conn.fetchrow(RANDOM_BOOK_FALLBACK_SQL)
+
+        if not row:
+            logger.warning("No books found for random selection")
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="No books found in database",
             )
-            for row in rows
-        ]
 
-    except Exception as e:
-        logger.error(f"Failed to fetch books: {e}")
+        return BookResponse.model_construct(**_book_json(row))
+
+    except (asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+        logger.error("Failed to fetch random book: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to fetch books",
+            detail="Failed to fetch random book",
         )
 
 @router.get(
@@ -110,34 +269,33 @@ async def list_books(
     response_model=BookResponse,
     summary="Get a book by ID",
 )
-async def get_book_by_id(book_id: str, conn: asyncpg.Connection = Depends(get_db)):
+async def get_book_by_id(book_id: UUID):
     """Get a specific book by ID"""
+    cached = book_cache.get_book(book_id)
+    if cached is not None:
+        return _json_response(cached)
+
+    generation = book_cache.generation
     try:
-        row = await conn.fetchrow(
-            "SELECT book_id, name, genre, price, created_at, updated_at FROM books WHERE book_id = $1",
-            book_id,
-        )
+        async with get_db_connection() as conn:
+            row = await conn.fetchrow(
+                "SELECT book_id, name, genre, price, created_at, updated_at FROM books WHERE book_id = $1",
+                book_id,
+            )
 
         if not row:
-            logger.warning(f"Book not found: {book_id}")
+            logger.warning("Book not found: %s", book_id)
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Book with id {book_id} not found",
             )
 
-        return BookResponse(
-            book_id=row["book_id"],
-            name=row["name"],
-            genre=row["genre"],
-            price=float(row["price"]),
-            created_at=row["created_at"].isoformat(),
-            updated_at=row["updated_at"].isoformat(),
-        )
+        body = _dumps(_book_json(row))
+        book_cache.set_book(book_id, body, generation)
+        return _json_response(body)
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Failed to fetch book {book_id}: {e}")
+    except (asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+        logger.error("Failed to fetch book %s: %s", book_id, e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to fetch book",
@@ -149,65 +307,42 @@ async def get_book_by_id(book_id: str, conn: asyncpg.Connection = Depends(get_db
     summary="Update a book",
 )
 async def update_book(
-    book_id: str, book_update: BookUpdate, conn: asyncpg.Connection = Depends(get_db)
+    book_id: UUID, book_update: BookUpdate, conn: asyncpg.Connection = Depends(get_db)
 ):
     """Update a specific book"""
     try:
-        existing = await conn.fetchrow(
-            "SELECT 1 FROM books WHERE book_id = $1", book_id
-        )
-        if not existing:
-            logger.warning(f"Book not found for update: {book_id}")
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Book with id {book_id} not found",
-            )
-
-        update_fields = []
+        mask = 0
         values = []
-        param_count = 1
+        for column, bit in _UPDATABLE_COLUMNS:
+            value = getattr(book_update, column)
+            if value is not None:
+                mask |= bit
+                values.append(value)
 
-        if book_update.name is not None:
-            update_fields.append(f"name = ${param_count}")
-            values.append(book_update.name)
-            param_count += 1
-
-        if book_update.genre is not None:
-            update_fields.append(f"genre = ${param_count}")
-            values.append(book_update.genre)
-            param_count += 1
-
-        if book_update.price is not None:
-            update_fields.append(f"price = ${param_count}")
-            values.append(book_update.price)
-            param_count += 1
-
-        if not update_fields:
+        if not mask:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="No fields provided for update",
             )
 
         values.append(book_id)
-
-        query = f"UPDATE books SET {', '.join(update_fields)} WHERE book_id = ${param_count} RETURNING book_id, name, genre, price, created_at, updated_at"
+        query = UPDATE_SQLS[mask]
 
         row = await conn.fetchrow(query, *values)
-        logger.info(f"Book updated: {book_id}")
-
-        return BookResponse(
-            book_id=row["book_id"],
-            name=row["name"],
-            genre=row["genre"],
-            price=float(row["price"]),
-            created_at=row["created_at"].isoformat(),
-            updated_at=row["updated_at"].isoformat(),
-        )
+        if not row:
+            logger.warning("Book not found for update: %s", book_id)
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Book with id {book_id} not found",
+            )
+
+        book_cache.invalidate(book_id)
+        logger.info("Book updated: %s", book_id)
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Failed to update book {book_id}: {e}")
+        return BookResponse.model_construct(**_book_json(row))
+
+    except (asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+        logger.error("Failed to update book %s: %s", book_id, e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to update book",
@@ -218,68 +353,32 @@ async def update_book(
     response_model=SuccessResponse,
     summary="Delete a book",
 )
-async def delete_book(book_id: str, conn: asyncpg.Connection = Depends(get_db)):
+async def delete_book(book_id: UUID, conn: asyncpg.Connection = Depends(get_db)):
     """Delete a specific book"""
     try:
         result = await conn.execute("DELETE FROM books WHERE book_id = $1", book_id)
 
         if result == "DELETE 0":
-            logger.warning(f"Book not found for deletion: {book_id}")
+            logger.warning("Book not found for deletion: %s", book_id)
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Book with id {book_id} not found",
             )
 
-        logger.info(f"Book deleted: {book_id}")
+        book_cache.invalidate(book_id)
+        logger.info("Book deleted: %s", book_id)
         return SuccessResponse(
             message=f"Book with id {book_id} deleted successfully",
             status_code=200,
         )
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Failed to delete book {book_id}: {e}")
+    except (asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+        logger.error("Failed to delete book %s: %s", book_id, e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to delete book",
         )
 
-@router.get(
-    "/random-book",
-    response_model=BookResponse,
-    summary="Get a random book",
-)
-async def get_random_book(conn: asyncpg.Connection = Depends(get_db)):
-    """Get a random book from the database"""
-    try:
-        row = await conn.fetchrow(
-            "SELECT book_id, name, genre, price, created_at, updated_at FROM books ORDER BY RANDOM() LIMIT 1"
-        )
-
-        if not row:
-            logger.warning("No books found for random selection")
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="No books found in database",
-            )
-
-        return BookResponse(
-            book_id=row["book_id"],
-            name=row["name"],
-            genre=row["genre"],
-            price=float(row["price"]),
-            created_at=row["created_at"].isoformat(),
-            updated_at=row["updated_at"].isoformat(),
-        )
-
-    except Exception as e:
-        logger.error(f"Failed to fetch random book: {e}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to fetch random book",
-        )
-
 @router.get(
     "/stats/summary",
     response_model=dict,
@@ -288,28 +387,27 @@ async def get_random_book(conn: asyncpg.Connection = Depends(get_db)):
 async def get_books_stats(conn: asyncpg.Connection = Depends(get_db)):
     """Get statistics about books in the database"""
     try:
+        # Served from a materialized view, so this is a single-row read. The
+        # background loop (database.refresh_books_stats_loop) keeps it fresh; where
+        # that loop doesn't run, e.g. on Lambda, a stale view is refreshed here.
+        await ensure_books_stats_fresh(conn)
         stats = await conn.fetchrow("""
-            SELECT 
-                COUNT(*) as total_books,
-                COUNT(CASE WHEN genre = 'fiction' THEN 1 END) as fiction_count,
-                COUNT(CASE WHEN genre = 'non-fiction' THEN 1 END) as non_fiction_count,
-                AVG(price) as average_price,
-                MIN(price) as min_price,
-                MAX(price) as max_price
-            FROM books
+            SELECT total_books, fiction_count, non_fiction_count,
+                   average_price, min_price, max_price
+            FROM books_stats_mv
         """)
 
         return {
             "total_books": stats["total_books"],
             "fiction_count": stats["fiction_count"],
             "non_fiction_count": stats["non_fiction_count"],
-            "average_price": float(stats["average_price"]) if stats["average_price"] else 0,
-            "min_price": float(stats["min_price"]) if stats["min_price"] else 0,
-            "max_price": float(stats["max_price"]) if stats["max_price"] else 0,
+            "average_price": stats["average_price"] or 0,
+            "min_price": stats["min_price"] or 0,
+            "max_price": stats["max_price"] or 0,
         }
 
-    except Exception as e:
-        logger.error(f"Failed to fetch statistics: {e}")
+    except (asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+        logger.error("Failed to fetch statistics: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to fetch statistics",
@@ -1,15 +1,15 @@
-import json
 import logging
-import uuid
+import secrets
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
 import chardet
+import orjson
 from fastapi import (APIRouter, File, Form, HTTPException, Query, Request,
                      UploadFile, status)
 from fastapi.concurrency import run_in_threadpool
 
-from config import ALLOWED_EXTENSIONS, MAX_FILE_SIZE
+from config import ALLOWED_EXT_SET, ALLOWED_EXTENSIONS, MAX_FILE_SIZE
 from s3_service import s3_service
 from schemas import (DeleteFileResponse, FileUploadListResponse,
                      MultipleFileUploadResponse, UploadedFileInfo, UploadError)
@@ -21,6 +21,9 @@ router = APIRouter(tags=["Files"], prefix="/files")
 # Constants
 MAX_CONTENT_LENGTH_FOR_SCORING = 1024 * 1024  # 1MB limit for text content analysis
 CHUNK_SIZE = 8192  # 8KB chunks for memory-efficient reading
+ALLOWED_EXTENSIONS_TEXT = ", ".join(ext for exts in ALLOWED_EXTENSIONS.values() for ext in exts)
+# Maps each character that is invalid in filenames to "_"
+_FILENAME_TRANSLATION = str.maketrans(dict.fromkeys('<>:"/\\|?*', "_"))
 
 class FileValidator:
     """File validation utility class"""
@@ -49,14 +52,10 @@ class FileValidator:
                 detail="File must have an extension"
             )
             
-        allowed_extensions = []
-        for extensions in ALLOWED_EXTENSIONS.values():
-            allowed_extensions.extend(extensions)
-
-        if file_extension not in allowed_extensions:
+        if file_extension not in ALLOWED_EXT_SET:
             raise HTTPException(
                 status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
-                detail=f"File type '{file_extension}' not allowed. Allowed types: {', '.join(allowed_extensions)}",
+                detail=f"File type '{file_extension}' not allowed. Allowed types: {ALLOWED_EXTENSIONS_TEXT}",
             )
 
     @staticmethod
@@ -68,31 +67,21 @@ class FileValidator:
                 detail="Filename cannot be empty"
             )
         
-        # Remove/replace invalid characters
-        invalid_chars = '<>:"/\\|?*'
-        sanitized = ''.join(c if c not in invalid_chars else '_' for c in filename)
-        
-        # Ensure filename isn't too long
-        if len(sanitized) > 255:
-            sanitized = sanitized[:255]
-            
-        return sanitized
+        # Replace invalid characters and ensure filename isn't too long
+        return filename.translate(_FILENAME_TRANSLATION)[:255]
 
 class ContentProcessor:
     """Content processing utility class"""
     
     @staticmethod
-    async def read_file_content_safely(file: UploadFile) -> tuple[bytes, str, float]:
+    async def read_file_content_safely(file: UploadFile) -> tuple[str, float]:
         """
         Safely read file content with encoding detection and scoring
-        Returns: (raw_content, text_content, score)
+        Returns: (text_content, score)
         """
         try:
-            # Read raw content
-            raw_content = await file.read()
-            
-            # Limit content size for text processing to avoid memory issues
-            content_for_analysis = raw_content[:MAX_CONTENT_LENGTH_FOR_SCORING]
+            # Only the analysed prefix is read; the upload itself streams from file.file
+            content_for_analysis = await file.read(MAX_CONTENT_LENGTH_FOR_SCORING)
             
             # Detect encoding for text files
             text_content = await ContentProcessor._decode_content(content_for_analysis)
@@ -100,11 +89,11 @@ class ContentProcessor:
             # Calculate score
             score = ContentProcessor.calculate_file_score(text_content)
             
-            return raw_content, text_content, score
+            return text_content, score
             
         except Exception as e:
-            logger.warning(f"Error processing file content: {e}")
-            return raw_content, "", 0.0
+            logger.warning("Error processing file content: %s", e)
+            return "", 0.0
 
     @staticmethod
     async def _decode_content(content: bytes) -> str:
@@ -129,7 +118,7 @@ class ContentProcessor:
                     return content.decode('latin-1', errors='replace')
                     
             except Exception as e:
-                logger.warning(f"Encoding detection failed: {e}")
+                logger.warning("Encoding detection failed: %s", e)
                 # Final fallback
                 return content.decode('utf-8', errors='ignore')
 
@@ -158,7 +147,7 @@ class ContentProcessor:
             return round(min(100.0, total_score), 2)
             
         except Exception as e:
-            logger.warning(f"Error calculating file score: {e}")
+            logger.warning("Error calculating file score: %s", e)
             return 0.0
 
 class MetadataHandler:
@@ -171,26 +160,26 @@ class MetadataHandler:
             return None
             
         try:
-            parsed = json.loads(metadata_str)
+            parsed = orjson.loads(metadata_str)
             # Validate that it's a dictionary
             if not isinstance(parsed, dict):
-                logger.warning(f"Metadata must be a JSON object, got: {type(parsed)}")
+                logger.warning("Metadata must be a JSON object, got: %s", type(parsed))
                 return None
             return parsed
-        except json.JSONDecodeError as e:
-            logger.warning(f"Invalid metadata JSON: {e}")
+        except orjson.JSONDecodeError as e:
+            logger.warning("Invalid metadata JSON: %s", e)
             return None
         except Exception as e:
-            logger.error(f"Unexpected error parsing metadata: {e}")
+            logger.error("Unexpected error parsing metadata: %s", e)
             return None
 
-async def get_client_ip(request: Request) -> str:
+def get_client_ip(request: Request) -> str:
     """Get client IP address with proper header checking"""
     # Check for forwarded headers (common in load balancer setups)
     forwarded_for = request.headers.get("X-Forwarded-For")
     if forwarded_for:
         # Take the first IP in the chain
-        return forwarded_for.split(",")[0].strip()
+        return forwarded_for.partition(",")[0].strip()
     
     real_ip = request.headers.get("X-Real-IP")
     if real_ip:
@@ -199,7 +188,7 @@ async def get_client_ip(request: Request) -> str:
     # Fallback to direct client IP
     return request.client.host if request.client else "unknown"
 
-async def generate_safe_filename(
+def generate_safe_filename(
     original_filename: str, 
     custom_filename: Optional[str] = None
 ) -> str:
@@ -211,8 +200,8 @@ async def generate_safe_filename(
         safe_name = FileValidator.validate_filename(custom_filename)
         filename = f"{safe_name}{file_extension}"
     else:
-        # Generate UUID-based filename
-        filename = f"{uuid.uuid4().hex}{file_extension}"
+        # Generate random 128-bit hex filename
+        filename = f"{secrets.token_hex(16)}{file_extension}"
     
     return filename
 
@@ -241,13 +230,13 @@ async def upload_file(
         FileValidator.validate_file_basic(file)
         
         # Process file content
-        raw_content, text_content, score = await ContentProcessor.read_file_content_safely(file)
+        text_content, score = await ContentProcessor.read_file_content_safely(file)
         
         # Reset file pointer for S3 upload
         await file.seek(0)
 
         # Generate safe filename
-        filename = await generate_safe_filename(file.filename, custom_filename)
+        filename = generate_safe_filename(file.filename, custom_filename)
 
         # Upload to S3
         result = await s3_service.upload_file(file, filename, folder)
@@ -256,7 +245,7 @@ async def upload_file(
         upload_metadata = MetadataHandler.parse_metadata(metadata)
 
         # Get client IP
-        client_ip = await get_client_ip(request)
+        client_ip = get_client_ip(request)
 
         # Store in database
         db_record = await uploads_service.create_upload_record(
@@ -274,9 +263,11 @@ async def upload_file(
         )
 
         logger.info(
-            f"File uploaded successfully: {result['s3_key']}, "
-            f"DB ID: {db_record['id'] if db_record else 'N/A'}, "
-            f"Score: {score}, Size: {result['file_size']} bytes"
+            "File uploaded successfully: %s, DB ID: %s, Score: %s, Size: %s bytes",
+            result["s3_key"],
+            db_record["id"] if db_record else "N/A",
+            score,
+            result["file_size"],
         )
 
         return MultipleFileUploadResponse(
@@ -298,7 +289,7 @@ async def upload_file(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Upload failed: {e}", exc_info=True)
+        logger.error("Upload failed: %s", e, exc_info=True)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, 
             detail=f"Upload failed: {str(e)}"
@@ -342,7 +333,7 @@ async def upload_multiple_files(
         upload_metadata = MetadataHandler.parse_metadata(metadata)
 
         # Get client IP once
-        client_ip = await get_client_ip(request)
+        client_ip = get_client_ip(request)
 
         # Sanitize prefix if provided
         safe_prefix = None
@@ -355,7 +346,7 @@ async def upload_multiple_files(
                 FileValidator.validate_file_basic(file)
                 
                 # Process file content
-                raw_content, text_content, score = await ContentProcessor.read_file_content_safely(file)
+                text_content, score = await ContentProcessor.read_file_content_safely(file)
                 
                 # Reset file pointer for S3 upload
                 await file.seek(0)
@@ -363,7 +354,7 @@ async def upload_multiple_files(
                 # Generate filename with prefix
                 file_extension = Path(file.filename).suffix.lower()
                 filename_prefix = f"{safe_prefix}_" if safe_prefix else ""
-                filename = f"{filename_prefix}{uuid.uuid4().hex}{file_extension}"
+                filename = f"{filename_prefix}{secrets.token_hex(16)}{file_extension}"
 
                 # Upload to S3
                 result = await s3_service.upload_file(file, filename, folder)
@@ -394,8 +385,12 @@ async def upload_multiple_files(
                 )
 
                 logger.info(
-                    f"File {i+1}/{len(files)} uploaded: {result['s3_key']}, "
-                    f"DB ID: {db_record['id'] if db_record else 'N/A'}, Score: {score}"
+                    "File %d/%d uploaded: %s, DB ID: %s, Score: %s",
+                    i + 1,
+                    len(files),
+                    result["s3_key"],
+                    db_record["id"] if db_record else "N/A",
+                    score,
                 )
 
             except HTTPException as e:
@@ -406,7 +401,7 @@ async def upload_multiple_files(
                         status_code=e.status_code,
                     )
                 )
-                logger.warning(f"File upload failed: {file.filename} - {e.detail}")
+                logger.warning("File upload failed: %s - %s", file.filename, e.detail)
             except Exception as e:
                 errors.append(
                     UploadError(
@@ -415,7 +410,7 @@ async def upload_multiple_files(
                         status_code=500,
                     )
                 )
-                logger.error(f"File upload failed: {file.filename} - {e}", exc_info=True)
+                logger.error("File upload failed: %s - %s", file.filename, e, exc_info=True)
 
         success_count = len(uploaded_files)
         failed_count = len(errors)
@@ -437,7 +432,7 @@ async def upload_multiple_files(
         )
 
     except Exception as e:
-        logger.error(f"Multiple upload failed: {e}", exc_info=True)
+        logger.error("Multiple upload failed: %s", e, exc_info=True)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, 
             detail=f"Multiple upload failed: {str(e)}"
@@ -466,7 +461,7 @@ async def list_upload_records(
         )
 
     except Exception as e:
-        logger.error(f"Failed to list upload records: {e}", exc_info=True)
+        logger.error("Failed to list upload records: %s", e, exc_info=True)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, 
             detail=f"Failed to retrieve upload records: {str(e)}"
@@ -493,7 +488,7 @@ async def delete_upload_record(s3_key: str):
         # Delete from S3
         s3_success = await s3_service.delete_file(s3_key)
         if not s3_success:
-            logger.warning(f"File not found in S3: {s3_key}")
+            logger.warning("File not found in S3: %s", s3_key)
             # Continue with database deletion even if S3 delete fails
             # (file might have been manually deleted from S3)
 
@@ -501,7 +496,7 @@ async def delete_upload_record(s3_key: str):
         db_success = await uploads_service.delete_upload_record(s3_key)
         
         if db_success:
-            logger.info(f"Successfully deleted file and record: {s3_key}")
+            logger.info("Successfully deleted file and record: %s", s3_key)
             return DeleteFileResponse(
                 message="File and record deleted successfully",
                 deleted_key=s3_key,
@@ -516,7 +511,7 @@ async def delete_upload_record(s3_key: str):
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Delete failed for {s3_key}: {e}", exc_info=True)
+        logger.error("Delete failed for %s: %s", s3_key, e, exc_info=True)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, 
             detail=f"Delete operation failed: {str(e)}"
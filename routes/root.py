@@ -5,19 +5,22 @@ from schemas import SuccessResponse
 
 router = APIRouter(tags=["Root"])
 
+# Everything in the welcome payload is fixed at import time, so build it once
+_ROOT_RESPONSE = SuccessResponse(
+    message="Welcome to my bookstore app!",
+    status_code=200,
+    data={
+        "database": "NeonDB (Serverless PostgreSQL)",
+        "features": ["CRUD Operations", "Connection Pooling", "Auto-scaling"],
+        "environment": ENVIRONMENT,
+        "version": "2.0.0",
+    },
+)
+
 @router.get(
     "/",
     response_model=SuccessResponse,
     summary="API Root",
 )
 async def root():
-    return SuccessResponse(
-        message="Welcome to my bookstore app!",
-        status_code=200,
-        data={
-            "database": "NeonDB (Serverless PostgreSQL)",
-            "features": ["CRUD Operations", "Connection Pooling", "Auto-scaling"],
-            "environment": ENVIRONMENT,
-            "version": "2.0.0",
-        },
-    )
+    return _ROOT_RESPONSE
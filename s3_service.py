@@ -1,20 +1,34 @@
 import logging
 
 import boto3
+from botocore.config import Config
 from botocore.exceptions import ClientError, NoCredentialsError
 from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 
 from config import AWS_ACCESS_KEY_ID, AWS_REGION, AWS_SECRET_ACCESS_KEY, S3_BUCKET_NAME
 
 logger = logging.getLogger(__name__)
 
+# Covers the 40 threads run_in_threadpool can use plus upload_fileobj's
+# multipart workers, so concurrent calls reuse sockets instead of queueing
+S3_MAX_POOL_CONNECTIONS = 50
+
+S3_CLIENT_CONFIG = Config(
+    max_pool_connections=S3_MAX_POOL_CONNECTIONS,
+    retries={"max_attempts": 3, "mode": "standard"},
+    tcp_keepalive=True,
+    signature_version="s3v4",
+)
+
 class S3Service:
     def __init__(self):
         self.s3_client = boto3.client(
             's3',
             aws_access_key_id=AWS_ACCESS_KEY_ID,
             aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
-            region_name=AWS_REGION
+            region_name=AWS_REGION,
+            config=S3_CLIENT_CONFIG,
         )
         self.bucket_name = S3_BUCKET_NAME
 
@@ -24,8 +38,9 @@ class S3Service:
             # Generate S3 key
             s3_key = f"{folder}/{filename}" if folder else filename
             
-            # Upload file (without ACL)
-            self.s3_client.upload_fileobj(
+            # Upload file (without ACL); boto3 blocks, so keep it off the event loop
+            await run_in_threadpool(
+                self.s3_client.upload_fileobj,
                 file.file,
                 self.bucket_name,
                 s3_key,
@@ -57,13 +72,13 @@ class S3Service:
                 detail="AWS credentials not configured"
             )
         except ClientError as e:
-            logger.error(f"S3 upload error: {e}")
+            logger.error("S3 upload error: %s", e)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Failed to upload file: {e}"
             )
         except Exception as e:
-            logger.error(f"Unexpected error during upload: {e}")
+            logger.error("Unexpected error during upload: %s", e)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Upload failed: {e}"
@@ -72,14 +87,15 @@ class S3Service:
     async def delete_file(self, s3_key: str) -> bool:
         """Delete file from S3 bucket"""
         try:
-            self.s3_client.delete_object(
+            await run_in_threadpool(
+                self.s3_client.delete_object,
                 Bucket=self.bucket_name,
                 Key=s3_key
             )
             return True
             
         except ClientError as e:
-            logger.error(f"S3 delete error: {e}")
+            logger.error("S3 delete error: %s", e)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Failed to delete file: {e}"
@@ -88,7 +104,8 @@ class S3Service:
     async def list_files(self, prefix: str = None) -> list:
         """List all files in S3 bucket"""
         try:
-            response = self.s3_client.list_objects_v2(
+            response = await run_in_threadpool(
+                self.s3_client.list_objects_v2,
                 Bucket=self.bucket_name,
                 Prefix=prefix
             )
@@ -107,7 +124,7 @@ class S3Service:
             return files
             
         except ClientError as e:
-            logger.error(f"S3 list error: {e}")
+            logger.error("S3 list error: %s", e)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Failed to list files: {e}"
@@ -123,7 +140,7 @@ class S3Service:
             )
             return url
         except ClientError as e:
-            logger.error(f"S3 presigned URL error: {e}")
+            logger.error("S3 presigned URL error: %s", e)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Failed to generate URL: {e}"
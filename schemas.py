@@ -1,6 +1,8 @@
-from typing import Any, Dict, List, Literal, Optional
+from datetime import datetime
+from typing import Any, Dict, List, Literal, Optional, Union
+from uuid import UUID
 
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 
 
 class Book(BaseModel):
@@ -10,12 +12,13 @@ class Book(BaseModel):
         ..., gt=0, description="Price must be greater than 0", example=12.99
     )
 
-    @field_validator("name")
+    @field_validator("name", mode="after")
     @classmethod
     def name_must_not_be_empty(cls, v: str) -> str:
-        if not v.strip():
+        stripped = v.strip()
+        if not stripped:
             raise ValueError("Name cannot be empty or whitespace only")
-        return v.strip()
+        return stripped
 
 class BookUpdate(BaseModel):
     name: Optional[str] = Field(
@@ -26,33 +29,30 @@ class BookUpdate(BaseModel):
         None, gt=0, description="Price must be greater than 0", example=15.99
     )
 
-    @field_validator("name")
+    @field_validator("name", mode="after")
     @classmethod
     def name_must_not_be_empty(cls, v: Optional[str]) -> Optional[str]:
-        if v is not None and not v.strip():
+        if v is None:
+            return v
+        stripped = v.strip()
+        if not stripped:
             raise ValueError("Name cannot be empty or whitespace only")
-        return v.strip() if v else v
+        return stripped
 
 class BookResponse(BaseModel):
-    book_id: str
+    # Built from DB rows and never mutated afterwards
+    model_config = ConfigDict(frozen=True)
+
+    book_id: UUID
     name: str
     genre: str
     price: float
-    created_at: str
-    updated_at: str
-
-class HealthResponse(BaseModel):
-    status: str
-    database: str
-    connection: str
-    database_name: str
-    postgresql_version: str
-    environment: str
-    response_time_ms: float
+    created_at: datetime
+    updated_at: datetime
 
 class ErrorResponse(BaseModel):
     error: str
-    detail: Optional[str] = None
+    detail: Optional[Union[str, List[Dict[str, Any]]]] = None
     status_code: int
 
 class SuccessResponse(BaseModel):
@@ -0,0 +1,106 @@
+"""
+Round-trip tests for the books API against a real PostgreSQL database.
+
+Set TEST_DATABASE_URL to a disposable database to run them; the schema is
+created on startup and the books table is emptied before each test.
+"""
+
+import os
+
+import pytest
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+if not TEST_DATABASE_URL:
+    pytest.skip("TEST_DATABASE_URL is not set", allow_module_level=True)
+
+# config reads the environment at import, so point it at the test database first
+os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+os.environ["RUN_MIGRATIONS"] = "1"
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import database  # noqa: E402
+from cache import book_cache  # noqa: E402
+from main import app  # noqa: E402
+
+BOOK = {"name": "Dune", "genre": "fiction", "price": 9.5}
+
+
+@pytest.fixture
+def client():
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture(autouse=True)
+def empty_books(client):
+    async def truncate():
+        async with database.get_db_connection() as conn:
+            await conn.execute("TRUNCATE books")
+
+    client.portal.call(truncate)
+    book_cache.invalidate()
+
+
+def test_create_then_list_and_get(client):
+    created = client.post("/api/v1/books", json=BOOK)
+    assert created.status_code == 201
+    book = created.json()
+    assert book["name"] == BOOK["name"]
+
+    listed = client.get("/api/v1/books")
+    assert listed.status_code == 200
+    assert [item["book_id"] for item in listed.json()] == [book["book_id"]]
+
+    fetched = client.get(f"/api/v1/books/{book['book_id']}")
+    assert fetched.status_code == 200
+    assert fetched.json() == book
+
+    # Second reads are served from the cache and must match the first
+    assert client.get("/api/v1/books").json() == listed.json()
+    assert client.get(f"/api/v1/books/{book['book_id']}").json() == book
+
+
+@pytest.mark.parametrize("tablesample", [True, False])
+def test_random_book(client, monkeypatch, tablesample):
+    from routes import books
+
+    monkeypatch.setattr(books, "_tablesample_available", tablesample)
+    assert client.get("/api/v1/books/random-book").status_code == 404
+
+    ids = {client.post("/api/v1/books", json=BOOK).json()["book_id"] for _ in range(3)}
+    for _ in range(5):
+        response = client.get("/api/v1/books/random-book")
+        assert response.status_code == 200
+        assert response.json()["book_id"] in ids
+
+
+def test_stats_refresh_on_demand(client, monkeypatch):
+    # As on Lambda, where lifespan is off and the refresh loop never runs
+    monkeypatch.setattr(database, "_stats_refreshed_at", None)
+    client.post("/api/v1/books", json=BOOK)
+    client.post("/api/v1/books", json={**BOOK, "genre": "non-fiction", "price": 20.5})
+
+    stats = client.get("/api/v1/books/stats/summary").json()
+    assert stats["total_books"] == 2
+    assert stats["fiction_count"] == 1
+    assert stats["max_price"] == 20.5
+
+
+def test_bulk_create(client):
+    books = [{**BOOK, "name": f"Book {i}", "price": 1.25 * i} for i in range(1, 4)]
+    created = client.post("/api/v1/books/bulk", json=books)
+    assert created.status_code == 201
+    assert created.json()["data"] == {"created": 3}
+
+    listed = client.get("/api/v1/books").json()
+    assert sorted((item["name"], item["price"]) for item in listed) == [
+        ("Book 1", 1.25),
+        ("Book 2", 2.5),
+        ("Book 3", 3.75),
+    ]
+
+
+@pytest.mark.parametrize("query", ["limit=0", "limit=1001", "offset=-1"])
+def test_list_books_rejects_out_of_range_paging(client, query):
+    assert client.get(f"/api/v1/books?{query}").status_code == 422
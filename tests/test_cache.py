@@ -0,0 +1,36 @@
+from uuid import uuid4
+
+from cache import BookCache
+
+
+def test_page_read_before_invalidate_is_not_cached():
+    cache = BookCache()
+    generation = cache.generation
+
+    # A write lands while the read's query is still in flight
+    cache.invalidate()
+    cache.set_page((None, 100, 0), b"[]", generation)
+
+    assert cache.get_page((None, 100, 0)) is None
+
+
+def test_book_read_before_invalidate_is_not_cached():
+    cache = BookCache()
+    book_id = uuid4()
+    generation = cache.generation
+
+    cache.invalidate(book_id)
+    cache.set_book(book_id, b"{}", generation)
+
+    assert cache.get_book(book_id) is None
+
+
+def test_current_generation_is_cached():
+    cache = BookCache()
+    book_id = uuid4()
+
+    cache.set_book(book_id, b"{}", cache.generation)
+    cache.set_page((None, 100, 0), b"[]", cache.generation)
+
+    assert cache.get_book(book_id) == b"{}"
+    assert cache.get_page((None, 100, 0)) == b"[]"
@@ -1,13 +1,21 @@
-import json
 import logging
 import re
 from datetime import datetime
 from typing import Any, Dict, Optional
 
+import asyncpg
+import orjson
+
 from database import ensure_db_initialized
 
 logger = logging.getLogger(__name__)
 
+# SQLSTATEs 22021 ("invalid byte sequence") and 22P05
+ENCODING_ERRORS = (
+    asyncpg.CharacterNotInRepertoireError,
+    asyncpg.UntranslatableCharacterError,
+)
+
 
 class DatabaseTextCleaner:
     """Utility class for cleaning text before database insertion"""
@@ -35,7 +43,7 @@ class DatabaseTextCleaner:
             return cleaned
             
         except Exception as e:
-            logger.warning(f"Error cleaning text for database: {e}")
+            logger.warning("Error cleaning text for database: %s", e)
             # Return empty string if cleaning fails
             return ""
 
@@ -48,7 +56,7 @@ class DatabaseTextCleaner:
             return text
             
         if len(text) > max_length:
-            logger.warning(f"Text content truncated from {len(text)} to {max_length} characters")
+            logger.warning("Text content truncated from %s to %s characters", len(text), max_length)
             return text[:max_length] + "...[truncated]"
             
         return text
@@ -64,11 +72,11 @@ class DatabaseTextCleaner:
         try:
             # Recursively clean all string values in metadata
             cleaned_metadata = DatabaseTextCleaner._clean_dict_strings(metadata)
-            metadata_json = json.dumps(cleaned_metadata)
+            metadata_json = orjson.dumps(cleaned_metadata, option=orjson.OPT_NON_STR_KEYS).decode()
             # Clean the final JSON string too
             return DatabaseTextCleaner.clean_for_postgresql(metadata_json)
         except Exception as e:
-            logger.warning(f"Failed to serialize metadata: {e}")
+            logger.warning("Failed to serialize metadata: %s", e)
             return None
 
     @staticmethod
@@ -161,26 +169,25 @@ class UploadsService:
                     # Parse metadata back to dict if it exists
                     if result.get("metadata") and isinstance(result["metadata"], str):
                         try:
-                            result["metadata"] = json.loads(result["metadata"])
-                        except json.JSONDecodeError:
+                            result["metadata"] = orjson.loads(result["metadata"])
+                        except orjson.JSONDecodeError:
                             result["metadata"] = {}
                     
-                    logger.info(f"Upload record created successfully: ID {result['id']}")
+                    logger.info("Upload record created successfully: ID %s", result['id'])
                     return result
                 
                 logger.error("Failed to create upload record: No record returned")
                 return None
 
         except Exception as e:
-            logger.error(f"Failed to create upload record: {e}", exc_info=True)
+            logger.error("Failed to create upload record: %s", e, exc_info=True)
             
             # Check for specific PostgreSQL errors
-            error_str = str(e).lower()
-            if "invalid byte sequence" in error_str:
+            if isinstance(e, ENCODING_ERRORS):
                 logger.error("PostgreSQL encoding error detected. Check for null bytes or invalid UTF-8.")
-            elif "value too long" in error_str:
+            elif isinstance(e, asyncpg.StringDataRightTruncationError):
                 logger.error("Text content too long for database field.")
-            elif "violates check constraint" in error_str:
+            elif isinstance(e, asyncpg.CheckViolationError):
                 logger.error("Database constraint violation.")
             
             raise Exception(f"Database error: {str(e)}")
@@ -212,15 +219,15 @@ class UploadsService:
                     # Parse metadata JSON if it exists
                     if result.get("metadata") and isinstance(result["metadata"], str):
                         try:
-                            result["metadata"] = json.loads(result["metadata"])
-                        except json.JSONDecodeError:
-                            logger.warning(f"Invalid metadata JSON in record {record['id']}")
+                            result["metadata"] = orjson.loads(result["metadata"])
+                        except orjson.JSONDecodeError:
+                            logger.warning("Invalid metadata JSON in record %s", record['id'])
                             result["metadata"] = {}
                     return result
                 return None
 
         except Exception as e:
-            logger.error(f"Failed to get upload record for S3 key '{s3_key}': {e}")
+            logger.error("Failed to get upload record for S3 key '%s': %s", s3_key, e)
             return None
 
     async def get_upload_record(self, s3_key: str) -> Optional[Dict[str, Any]]:
@@ -298,20 +305,20 @@ class UploadsService:
                         # Parse metadata
                         if record_dict.get("metadata") and isinstance(record_dict["metadata"], str):
                             try:
-                                record_dict["metadata"] = json.loads(record_dict["metadata"])
-                            except json.JSONDecodeError:
-                                logger.warning(f"Invalid metadata JSON in record {record_dict.get('id', 'unknown')}")
+                                record_dict["metadata"] = orjson.loads(record_dict["metadata"])
+                            except orjson.JSONDecodeError:
+                                logger.warning("Invalid metadata JSON in record %s", record_dict.get('id', 'unknown'))
                                 record_dict["metadata"] = {}
                         processed_records.append(record_dict)
                     except Exception as e:
-                        logger.warning(f"Error processing record: {e}")
+                        logger.warning("Error processing record: %s", e)
                         continue
 
-                logger.info(f"Retrieved {len(processed_records)} upload records (total: {total_count})")
+                logger.info("Retrieved %s upload records (total: %s)", len(processed_records), total_count)
                 return {"records": processed_records, "total_count": total_count}
 
         except Exception as e:
-            logger.error(f"Failed to list uploads: {e}", exc_info=True)
+            logger.error("Failed to list uploads: %s", e, exc_info=True)
             raise Exception(f"Failed to retrieve upload records: {str(e)}")
 
     async def delete_upload_record(self, s3_key: str) -> bool:
@@ -334,14 +341,14 @@ class UploadsService:
                 
                 deleted = result == "DELETE 1"
                 if deleted:
-                    logger.info(f"Successfully deleted upload record for S3 key: {s3_key}")
+                    logger.info("Successfully deleted upload record for S3 key: %s", s3_key)
                 else:
-                    logger.warning(f"No record found to delete for S3 key: {s3_key}")
+                    logger.warning("No record found to delete for S3 key: %s", s3_key)
                     
                 return deleted
                 
         except Exception as e:
-            logger.error(f"Failed to delete upload record for S3 key '{s3_key}': {e}")
+            logger.error("Failed to delete upload record for S3 key '%s': %s", s3_key, e)
             return False
 
     async def update_upload_status(
@@ -375,7 +382,7 @@ class UploadsService:
                 return result == "UPDATE 1"
                 
         except Exception as e:
-            logger.error(f"Failed to update upload status: {e}")
+            logger.error("Failed to update upload status: %s", e)
             return False
 
     async def clean_existing_records(self) -> Dict[str, int]:
@@ -410,11 +417,11 @@ class UploadsService:
                 # Extract the number of updated rows
                 updated_count = int(result.split()[-1]) if result.startswith("UPDATE") else 0
                 
-                logger.info(f"Cleaned {updated_count} existing records")
+                logger.info("Cleaned %s existing records", updated_count)
                 return {"cleaned_records": updated_count}
                 
         except Exception as e:
-            logger.error(f"Failed to clean existing records: {e}")
+            logger.error("Failed to clean existing records: %s", e)
             return {"error": str(e), "cleaned_records": 0}
 
     async def get_upload_stats(self) -> Dict[str, Any]:
@@ -428,7 +435,7 @@ class UploadsService:
                     SELECT 
                         COUNT(*) as total_uploads,
                         COUNT(DISTINCT user_id) as unique_users,
-                        SUM(file_size) as total_size_bytes,
+                        SUM(file_size)::BIGINT as total_size_bytes,
                         AVG(score) as average_score,
                         COUNT(CASE WHEN upload_status = 'success' THEN 1 END) as successful_uploads,
                         COUNT(CASE WHEN upload_status = 'failed' THEN 1 END) as failed_uploads
@@ -448,7 +455,7 @@ class UploadsService:
                 return {}
                 
         except Exception as e:
-            logger.error(f"Failed to get upload stats: {e}")
+            logger.error("Failed to get upload stats: %s", e)
             return {}
 
 